@@ -8,17 +8,79 @@ from scservo_sdk import COMM_SUCCESS, COMM_TX_FAIL
 from typing import Optional, List
 from config import MOTOR_RESOLUTION
 
+# Feetech STS control table: EEPROM below Torque_Enable (persists, wears on write),
+# RAM from there on (reset at power-up)
+_RAM_START = 40
+
 _CTL = {
+    # EEPROM
+    "Firmware_Major_Version": (0, 1),
+    "Firmware_Minor_Version": (1, 1),
+    "Model_Number": (3, 2),
     "ID": (5, 1),
-    "Present_Position": (56, 2),
-    "Goal_Position":    (42, 2),
-    "Homing_Offset": (31, 2),
+    "Baud_Rate": (6, 1),
+    "Return_Delay_Time": (7, 1),
+    "Response_Status_Level": (8, 1),
     "Min_Position_Limit": (9, 2),
     "Max_Position_Limit": (11, 2),
+    "Max_Temperature_Limit": (13, 1),
+    "Max_Voltage_Limit": (14, 1),
+    "Min_Voltage_Limit": (15, 1),
+    "Max_Torque_Limit": (16, 2),
+    "Phase": (18, 1),
+    "Unloading_Condition": (19, 1),
+    "LED_Alarm_Condition": (20, 1),
+    "P_Coefficient": (21, 1),
+    "D_Coefficient": (22, 1),
+    "I_Coefficient": (23, 1),
+    "Minimum_Startup_Force": (24, 2),
+    "CW_Dead_Zone": (26, 1),
+    "CCW_Dead_Zone": (27, 1),
+    "Protection_Current": (28, 2),
+    "Angular_Resolution": (30, 1),
+    "Homing_Offset": (31, 2),
+    "Operating_Mode": (33, 1),
+    "Protective_Torque": (34, 1),
+    "Protection_Time": (35, 1),
+    "Overload_Torque": (36, 1),
+    "Velocity_P_Coefficient": (37, 1),
+    "Over_Current_Protection_Time": (38, 1),
+    "Velocity_I_Coefficient": (39, 1),
+    # RAM
+    "Torque_Enable": (40, 1),
+    "Acceleration": (41, 1),
+    "Goal_Position":    (42, 2),
+    "Goal_Time": (44, 2),
+    "Goal_Velocity": (46, 2),
+    "Torque_Limit": (48, 2),
+    "Lock": (55, 1),
+    "Present_Position": (56, 2),
+    "Present_Velocity": (58, 2),
+    "Present_Load": (60, 2),
+    "Present_Voltage": (62, 1),
+    "Present_Temperature": (63, 1),
+    "Status": (65, 1),
+    "Moving": (66, 1),
+    "Present_Current": (69, 2),
 }
 
+_READ_ONLY = {
+    "Firmware_Major_Version", "Firmware_Minor_Version", "Model_Number",
+    "Present_Position", "Present_Velocity", "Present_Load", "Present_Voltage",
+    "Present_Temperature", "Status", "Moving", "Present_Current",
+}
+
+# change every control cycle, or behind our back (protection clears
+# Torque_Enable), so never kept in the shadow cache
+_VOLATILE = _READ_ONLY | {"Goal_Position", "Goal_Time", "Goal_Velocity", "Torque_Enable"}
+
+# move the servo off its current address/baud rate, not safe mid-sync_config
+_BUS_SETTINGS = {"ID", "Baud_Rate"}
+
 _SIGNBIT = {
     "Homing_Offset": 11,
+    "Goal_Velocity": 15,
+    "Present_Velocity": 15,
 }
 
 _ENC2RAD = 2.0 * np.pi / MOTOR_RESOLUTION      # radians per encoder count 
@@ -81,6 +143,25 @@ def _decode_signmag(u: int, sign_bit: int, nbytes: int) -> int:
 def _to_le_bytes(value: int, nbytes: int) -> list[int]:
     return list(int(value).to_bytes(nbytes, "little", signed=False))
 
+def _encode(reg_name: str, v: int) -> int:
+    """Python int -> unsigned register value."""
+    length = _CTL[reg_name][1]
+    sign_bit = _SIGNBIT.get(reg_name)
+    if sign_bit is not None:
+        return _encode_signmag(int(v), sign_bit, length)
+    return int(v) & ((1 << (8 * length)) - 1)
+
+def _decode(reg_name: str, u: int) -> int:
+    """Unsigned register value -> python int."""
+    sign_bit = _SIGNBIT.get(reg_name)
+    return _decode_signmag(u, sign_bit, _CTL[reg_name][1]) if sign_bit is not None else u
+
+def _check_reg(reg_name: str, write: bool = False):
+    if reg_name not in _CTL:
+        raise KeyError(f"Unknown register '{reg_name}'")
+    if write and reg_name in _READ_ONLY:
+        raise ValueError(f"Register '{reg_name}' is read-only")
+
 class FeetechBus:
     def __init__(self, 
                  port: str, 
@@ -94,6 +175,7 @@ class FeetechBus:
             raise OSError(f"Cannot open {port}")
         self.port_handler.setBaudRate(baudrate)
         self.packet_handler = PacketHandler(protocol)
+        self._shadow: dict[int, dict[str, int]] = {}   # {id: {reg_name: value}} config registers
 
         self.assert_same_firmware()
 
@@ -108,32 +190,38 @@ class FeetechBus:
         self.port_handler.closePort()
 
     def sync_read(self, reg_name: str, ids: Optional[list[int]] = None) -> np.ndarray:
-        if reg_name not in _CTL:
-            raise KeyError(f"Unknown register {reg_name}")
-        addr, length = _CTL[reg_name]
-        ids = self.ids if ids is None else ids 
+        return self.read_registers([reg_name], ids)[reg_name]
 
-        reader = GroupSyncRead(self.port_handler, self.packet_handler, addr, length)
+    def read_registers(self, reg_names: list[str], ids: Optional[list[int]] = None) -> dict[str, np.ndarray]:
+        """Read several registers in one sync read spanning all of them."""
+        for name in reg_names:
+            _check_reg(name)
+        ids = self.ids if ids is None else ids
+
+        start = min(_CTL[n][0] for n in reg_names)
+        end = max(sum(_CTL[n]) for n in reg_names)
+
+        reader = GroupSyncRead(self.port_handler, self.packet_handler, start, end - start)
         for sid in ids: 
             reader.addParam(sid)
         
         comm = reader.txRxPacket()
         if comm != COMM_SUCCESS:
             print("comm : ", comm, self.packet_handler.getTxRxResult(comm))
-            raise RuntimeError(f"Read failed for '{reg_name}'")
+            raise RuntimeError(f"Read failed for {', '.join(reg_names)}")
         
-        vals = []
-        sign_bit = _SIGNBIT.get(reg_name)
-        for sid in ids: 
-            u = reader.getData(sid, addr, length)
-            v = _decode_signmag(u, sign_bit, length) if sign_bit is not None else u 
-            vals.append(v)
+        out = {}
+        for name in reg_names:
+            addr, length = _CTL[name]
+            vals = [_decode(name, reader.getData(sid, addr, length)) for sid in ids]
+            self._remember(name, ids, vals)
+            out[name] = np.array(vals, dtype=np.int32)
         
-        return np.array(vals, dtype=np.int32)
+        return out
 
-    def sync_write(self, reg_name: str, values: list[int], ids: Optional[list[int]] = None):
-        if reg_name not in _CTL:
-            raise KeyError(f"Unknown register '{reg_name}'")
+    def sync_write(self, reg_name: str, values: list[int], ids: Optional[list[int]] = None,
+                   tolerate_tx_fail: bool = False):
+        _check_reg(reg_name, write=True)
         addr, length = _CTL[reg_name]
         ids = self.ids if ids is None else ids
 
@@ -141,20 +229,177 @@ class FeetechBus:
             raise ValueError("values length must match ids length")
         
         writer = GroupSyncWrite(self.port_handler, self.packet_handler, addr, length)
-        sign_bit = _SIGNBIT.get(reg_name)
-        width_mask = (1 << (8 * length)) - 1
-
         for sid, v in zip(ids, values):
-            u = _encode_signmag(int(v), sign_bit, length) if sign_bit is not None else (int(v) & width_mask)
-            writer.addParam(sid, _to_le_bytes(u, length))
-
-        if writer.txPacket() != COMM_SUCCESS:
+            writer.addParam(sid, _to_le_bytes(_encode(reg_name, v), length))
+
+        res = writer.txPacket()
+        if res == COMM_TX_FAIL and tolerate_tx_fail:
+            # value on the servos is unknown now
+            for sid in ids:
+                self._shadow.get(sid, {}).pop(reg_name, None)
+            return
+        if res != COMM_SUCCESS:
             raise RuntimeError(f"Write failed for {reg_name}")
+        if reg_name in _BUS_SETTINGS:
+            # servos answer on a new id/baud now, nothing cached still applies
+            self.invalidate_cache(ids)
+            return
+        self._remember(reg_name, ids, values)
+
+    def _remember(self, reg_name: str, ids: list[int], values):
+        if reg_name in _VOLATILE:
+            return
+        for sid, v in zip(ids, values):
+            self._shadow.setdefault(sid, {})[reg_name] = int(v)
+
+    def cached(self, reg_name: str, ids: Optional[list[int]] = None) -> Optional[np.ndarray]:
+        """Last value read/written per id, or None if any id hasn't been seen."""
+        ids = self.ids if ids is None else ids
+        vals = [self._shadow.get(sid, {}).get(reg_name) for sid in ids]
+        if any(v is None for v in vals):
+            return None
+        return np.array(vals, dtype=np.int32)
+
+    def invalidate_cache(self, ids: Optional[list[int]] = None):
+        for sid in (self.ids if ids is None else ids):
+            self._shadow.pop(sid, None)
+
+    def sync_config(self, desired: dict, ids: Optional[list[int]] = None,
+                    refresh: bool = True,
+                    eeprom_settle_s: float = 0.05) -> dict[str, dict[int, int]]:
+        """Bring registers to `desired` values, writing only the ones that differ.
+
+        `desired` maps register name -> one value for all ids, or one per id.
+        Current values come from a single bulk read (or the shadow cache when
+        refresh=False), and changed registers are merged into as few sync
+        writes as possible. Servos are unlocked around EEPROM writes, which get
+        `eeprom_settle_s` to commit before Lock is set back (to its old value,
+        or to `desired["Lock"]`). Returns {reg_name: {id: value}} actually written.
+        """
+        ids = self.ids if ids is None else ids
+        target = {}
+        for name, vals in desired.items():
+            _check_reg(name, write=True)
+            if name in _BUS_SETTINGS:
+                raise ValueError(f"'{name}' can't be changed by sync_config, "
+                                 "write it alone with sync_write and reconnect")
+            vals = np.atleast_1d(np.asarray(vals, dtype=np.int64))
+            if vals.size == 1:
+                vals = np.full(len(ids), vals[0])
+            if len(vals) != len(ids):
+                raise ValueError(f"'{name}': values length must match ids length")
+            target[name] = vals
+
+        # Lock is handled around the other writes, not in address order
+        lock_target = target.pop("Lock", None)
+        touches_eeprom = any(_CTL[n][0] < _RAM_START for n in target)
+        to_read = list(target)
+        if touches_eeprom or lock_target is not None:
+            to_read.append("Lock")
+
+        current = {}
+        if not refresh:
+            current = {n: self.cached(n, ids) for n in to_read}
+            to_read = [n for n in to_read if current[n] is None]
+        if to_read:
+            current.update(self.read_registers(to_read, ids))
+
+        changes = {}
+        for name in sorted(target, key=lambda n: _CTL[n][0]):
+            diff = {sid: int(v) for sid, v, cur in zip(ids, target[name], current[name])
+                    if _encode(name, v) != _encode(name, cur)}
+            if diff:
+                changes[name] = diff
+
+        lock_before = dict(zip(ids, (int(v) for v in current.get("Lock", []))))
+        lock_final = dict(zip(ids, (int(v) for v in lock_target))) if lock_target is not None else lock_before
+        lock_now = dict(lock_before)
+
+        # EEPROM writes are only kept while the servo is unlocked
+        eeprom_ids = {sid for n, diff in changes.items() if _CTL[n][0] < _RAM_START for sid in diff}
+        unlock = [sid for sid in ids if sid in eeprom_ids and lock_now.get(sid)]
+        if unlock:
+            self.sync_write("Lock", [0] * len(unlock), ids=unlock)
+            lock_now.update((sid, 0) for sid in unlock)
+
+        def relock():
+            relock_ids = [sid for sid in ids if sid in lock_final and lock_final[sid] != lock_now[sid]]
+            if relock_ids:
+                self.sync_write("Lock", [lock_final[sid] for sid in relock_ids], ids=relock_ids)
+
+        try:
+            self._write_changes(changes, pad=refresh)
+            if eeprom_ids and eeprom_settle_s > 0:
+                time.sleep(eeprom_settle_s)
+        except Exception:
+            # don't let a failed relock hide which write failed
+            try:
+                relock()
+            except RuntimeError as e:
+                print(f"Relock failed after write error: {e}")
+            raise
+        relock()
+
+        lock_diff = {sid: v for sid, v in lock_final.items() if v != lock_before[sid]}
+        if lock_diff:
+            changes["Lock"] = lock_diff
+        return changes
+
+    def _write_changes(self, changes: dict[str, dict[int, int]], pad: bool = True):
+        """Write {reg_name: {id: value}} as few address-contiguous sync writes.
+
+        Adjacent registers changing for the same ids are merged into one
+        packet. With `pad`, RAM registers also merge across differing ids,
+        padding the rest with values just read into the cache; EEPROM never
+        does, so unchanged cells aren't rewritten. Only pad right after a
+        fresh read, a stale cache could undo a change the servo made itself.
+        """
+        def fill(name, sid):
+            if sid in changes[name]:
+                return changes[name][sid]
+            return self._shadow.get(sid, {}).get(name)
+
+        blocks = []     # [[reg_names], {ids}]
+        for name in sorted(changes, key=lambda n: _CTL[n][0]):
+            addr = _CTL[name][0]
+            name_ids = set(changes[name])
+            if blocks:
+                names, block_ids = blocks[-1]
+                last_addr, last_len = _CTL[names[-1]]
+                same_area = (last_addr < _RAM_START) == (addr < _RAM_START)
+                if last_addr + last_len == addr and same_area:
+                    if addr < _RAM_START or not pad:
+                        mergeable = name_ids == block_ids
+                    else:
+                        union = block_ids | name_ids
+                        mergeable = all(fill(n, sid) is not None for n in names + [name] for sid in union)
+                    if mergeable:
+                        names.append(name)
+                        block_ids |= name_ids
+                        continue
+            blocks.append([[name], name_ids])
+
+        for names, block_ids in blocks:
+            addr = _CTL[names[0]][0]
+            length = sum(_CTL[n][1] for n in names)
+            block_ids = sorted(block_ids)
+
+            writer = GroupSyncWrite(self.port_handler, self.packet_handler, addr, length)
+            for sid in block_ids:
+                data = []
+                for n in names:
+                    data += _to_le_bytes(_encode(n, fill(n, sid)), _CTL[n][1])
+                writer.addParam(sid, data)
+
+            if writer.txPacket() != COMM_SUCCESS:
+                raise RuntimeError(f"Write failed for {', '.join(names)}")
+            for n in names:
+                self._remember(n, block_ids, [fill(n, sid) for sid in block_ids])
 
     def set_homing_offsets(self, raws: np.ndarray) -> np.ndarray:
-        """Write Homing_Offset."""
+        """Write Homing_Offset (to EEPROM, unlocking if needed)."""
         offsets = (raws.astype(np.int32) - MID_POSITION).tolist()
-        self.sync_write("Homing_Offset", offsets)
+        self.sync_config({"Homing_Offset": offsets})
         return np.array(offsets, dtype=np.int32)
 
     def get_qpos(self) -> np.ndarray:
@@ -171,11 +416,8 @@ class FeetechBus:
     def set_torque(self, enabled: bool):
         """Enable/disable torque on all servos in this bus."""
         val = 1 if enabled else 0
-        for sid in self.ids:
-            # DYNAMIXEL/Feetech Torque‑Enable register = 40 (0x28), 1 byte
-            res = self.packet_handler.write1ByteTxOnly(self.port_handler, sid, 40, val)
-            if res not in (COMM_SUCCESS, COMM_TX_FAIL):
-                raise RuntimeError(f"Torque write failed for ID {sid}")
+        # called from cleanup paths, a lost packet shouldn't mask the real error
+        self.sync_write("Torque_Enable", [val] * len(self.ids), tolerate_tx_fail=True)
             
     def get_firmware_versions(self):
         """Return {id: 'X'} for each motor (firmware version byte)."""
@@ -1,7 +1,7 @@
 # calibrate.py 
 
 import os 
-import json, argparse, time 
+import json, argparse
 from bus import FeetechBus
 from config import JOINT_NAMES, UIDS
 
@@ -44,8 +44,8 @@ def main():
     try: 
         bus.set_torque(False)
 
-        bus.sync_write("Homing_Offset", [0] * len(UIDS), ids=UIDS)
-        time.sleep(0.05)  # small pause for EEPROM write
+        # sync_config waits for the EEPROM write before relocking
+        bus.sync_config({"Homing_Offset": 0}, ids=UIDS)
 
         input("\nMove the arm to its *middle* pose, "
               "then press ENTER … ")
@@ -59,6 +59,7 @@ def main():
             print(f"  ID {sid}: {val}")
 
         calib = {}                         
+        range_mins, range_maxs = [], []
 
         for name, sid, homing_offset in zip(JOINT_NAMES, UIDS, homing_offsets):
             print(f"\nJoint {name}  (ID {sid})")
@@ -72,8 +73,8 @@ def main():
             # Decide which is min / max
             raw_min, raw_max = sorted((stop1, stop2))
 
-            bus.sync_write("Min_Position_Limit", [raw_min], ids=[sid])
-            bus.sync_write("Max_Position_Limit", [raw_max], ids=[sid])
+            range_mins.append(int(raw_min))
+            range_maxs.append(int(raw_max))
 
             calib[name] = {
                 "id": sid,
@@ -86,6 +87,10 @@ def main():
             print(f"    ↳ offset {calib[name]['homing_offset']}, "
                 f"range [{raw_min}, {raw_max}]")
 
+        # write all changed limits in one go
+        bus.sync_config({"Min_Position_Limit": range_mins,
+                         "Max_Position_Limit": range_maxs}, ids=UIDS)
+
         # save 
         with open(calib_file, "w") as f:
             json.dump(calib, f, indent=2)
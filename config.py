@@ -34,3 +34,13 @@ JOINT_NAMES = [
     "wrist_roll",
     "gripper",
 ]
+
+# ZMQ ports each arm publishes its state on (teleop.py)
+BASE_PORTS = {
+    "so101": {"leader": 6000, "follower": 6001},
+}
+
+# fanout.py re-publishes an arm's state on base port + offset
+FANOUT_PORT_OFFSET = 100   # full stream, bounded queue per consumer
+LATEST_PORT_OFFSET = 200   # latest-only stream, single-frame for zmq.CONFLATE clients
+FANOUT_HWM = 100
@@ -0,0 +1,139 @@
+# fanout.py
+
+import re, time, argparse, zmq
+from utils import make_sub
+from config import BASE_PORTS, FANOUT_PORT_OFFSET, LATEST_PORT_OFFSET, FANOUT_HWM
+
+_RATE_RE = re.compile(r"^@([0-9.]+)hz/(.*)$")
+
+def make_xpub(ctx, addr, sndhwm):
+    xpub = ctx.socket(zmq.XPUB)
+    xpub.setsockopt(zmq.SNDHWM, sndhwm)
+    xpub.bind(addr)
+    print(f"Fan-out (bind) on {addr}, hwm = {sndhwm}")
+    return xpub
+
+def handle_subscription(frames, topic_name, rates):
+    """Track decimated streams (see utils.decimated_topic) consumers (un)subscribed to.
+
+    XPUB only reports the first subscribe and the last unsubscribe of a
+    topic, so `rates` holds exactly the streams someone is listening to.
+    Anything other than a single subscribe (1) / unsubscribe (0) frame
+    is data from a misbehaving peer and is ignored.
+    """
+    if len(frames) != 1 or not frames[0] or frames[0][0] not in (0, 1):
+        return
+    frame = frames[0]
+    subscribe, topic = frame[0] == 1, frame[1:].decode(errors="replace")
+    m = _RATE_RE.match(topic)
+    if not m or m.group(2) != topic_name:
+        return
+    try:
+        rate_hz = float(m.group(1))
+    except ValueError:
+        return
+    if rate_hz <= 0:
+        return
+
+    if subscribe:
+        rates.setdefault(topic, [1.0 / rate_hz, 0.0])
+        print(f"+ {topic}")
+    else:
+        rates.pop(topic, None)
+        print(f"- {topic}")
+
+def forward(xpub, rates, topic_name, payload, now, single_frame=False):
+    """Send one upstream message: full rate, plus any decimated streams that are due.
+
+    With `single_frame`, messages go out as b"topic payload" so clients can
+    use zmq.CONFLATE, which only ever keeps the newest single-frame message.
+    """
+    def send(topic):
+        if single_frame:
+            xpub.send(topic.encode() + b" " + payload, flags=zmq.NOBLOCK)
+        else:
+            xpub.send_multipart([topic.encode(), payload], flags=zmq.NOBLOCK)
+
+    try:
+        send(topic_name)
+        for topic, stream in rates.items():
+            period, last_t = stream
+            if now - last_t >= period:
+                # step the deadline by whole periods so the average rate matches
+                # the request, restarting after a gap instead of bursting
+                stream[1] = last_t + period if now - last_t < 2 * period else now
+                send(topic)
+    except zmq.Again:
+        # XPUB drops per consumer at its hwm, this only fires if ZMQ_XPUB_NODROP is set
+        pass
+
+def run_broker(sub, xpubs, topic_name):
+    """`xpubs` maps each XPUB socket to whether it sends single-frame messages."""
+    poller = zmq.Poller()
+    poller.register(sub, zmq.POLLIN)
+    for xpub in xpubs:
+        poller.register(xpub, zmq.POLLIN)
+
+    rates = {xpub: {} for xpub in xpubs}   # {xpub: {topic: [period_s, last_sent_t]}}
+
+    while True:
+        events = dict(poller.poll())
+
+        for xpub in xpubs:
+            if events.get(xpub) == zmq.POLLIN:
+                handle_subscription(xpub.recv_multipart(), topic_name, rates[xpub])
+
+        if events.get(sub) == zmq.POLLIN:
+            while sub.poll(timeout=0):
+                _, payload = sub.recv_multipart(flags=zmq.NOBLOCK)
+                now = time.monotonic()
+                for xpub, single_frame in xpubs.items():
+                    forward(xpub, rates[xpub], topic_name, payload, now, single_frame)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-publish one arm's state to any number of consumers, "
+                    "so the control loop only ever sends to this process.")
+
+    parser.add_argument("--mode",
+                        choices=["leader", "follower"],
+                        default="follower",
+                        help="Which arm's state to fan out (default=follower)")
+    parser.add_argument("--device",
+                        choices=['so101', 'so100'],
+                        default="so101",
+                        help="Which device config to use (default=so101)")
+    parser.add_argument("--hwm", type=int, default=FANOUT_HWM,
+                        help=f"Per-consumer queue length on the full stream (default={FANOUT_HWM})")
+
+    args = parser.parse_args()
+
+    family, role = args.device, args.mode
+    device_name = f"{family}_{role}"
+    topic_name = f"{device_name}.state_real"
+
+    if family not in BASE_PORTS:
+        raise ValueError(f"No base port defined for {family}")
+    base_port = BASE_PORTS[family][role]
+
+    ctx = zmq.Context()
+
+    sub = make_sub(ctx, f"tcp://localhost:{base_port}", topic_name)
+    xpubs = {
+        make_xpub(ctx, f"tcp://*:{base_port + FANOUT_PORT_OFFSET}", args.hwm): False,
+        # single-frame, for clients subscribing with conflate=True
+        make_xpub(ctx, f"tcp://*:{base_port + LATEST_PORT_OFFSET}", args.hwm): True,
+    }
+
+    try:
+        run_broker(sub, xpubs, topic_name)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sub.close(0)
+        for xpub in xpubs:
+            xpub.close(0)
+        ctx.term()
+
+if __name__ == '__main__':
+    main()
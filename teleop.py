@@ -3,8 +3,8 @@
 import time, json, argparse, zmq
 import numpy as np 
 from bus import FeetechBus
-from utils import make_pub, make_sub, to_norm, from_norm
-from config import UIDS
+from utils import make_pub, make_sub, recv_latest, to_norm, from_norm
+from config import UIDS, BASE_PORTS
 import sys 
 
 def run_loop(pub, sub, get_state, apply_state, topic_name, calib_by_id, debug=False):
@@ -16,13 +16,9 @@ def run_loop(pub, sub, get_state, apply_state, topic_name, calib_by_id, debug=Fa
             msg = {"t": time.time(), "qpos_norm": qpos_norm}
             pub.send_multipart([topic_name.encode(), json.dumps(msg).encode()])
 
-            if sub and sub.poll(timeout=0):
-                latest_payload = None
-                
-                # Manually drain all messages, keep only the latest
-                while sub.poll(timeout=0):
-                    _, latest_payload = sub.recv_multipart(flags=zmq.NOBLOCK)
-                
+            if sub:
+                latest_payload = recv_latest(sub)
+
                 if latest_payload:
                     latest_msg = json.loads(latest_payload.decode())
                     follower_goal = np.array(latest_msg["qpos_norm"], dtype=np.float32)
@@ -83,10 +79,6 @@ def main():
 
     bus = FeetechBus(port, UIDS, calib_file=f"{device_name}_calibration.json")
 
-    BASE_PORTS = {
-        "so101": {"leader": 6000, "follower": 6001},
-    }
-
     if family not in BASE_PORTS:
         raise ValueError(f"No base port defined for {family}")
     
@@ -103,7 +95,8 @@ def main():
 
     # Publisher setup
     pub_addr = f"tcp://*:{pub_port}"
-    pub = make_pub(ctx, pub_addr, f"{device_name}.state_real", bind=True)
+    # keep the control loop's send queue short; extra consumers attach via fanout.py
+    pub = make_pub(ctx, pub_addr, f"{device_name}.state_real", bind=True, sndhwm=10)
 
     # Subscriber setup  
     sub_addr = f"tcp://localhost:{sub_port}"
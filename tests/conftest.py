@@ -0,0 +1,16 @@
+# tests/conftest.py
+
+import sys
+import types
+
+# bus.py imports the Feetech SDK at module level; the tests replace every SDK
+# class with fakes, so when the SDK isn't installed a bare placeholder will do
+try:
+    import scservo_sdk  # noqa: F401
+except ImportError:
+    sdk = types.ModuleType("scservo_sdk")
+    sdk.COMM_SUCCESS = 0
+    sdk.COMM_TX_FAIL = -1001
+    for name in ("PortHandler", "PacketHandler", "GroupSyncRead", "GroupSyncWrite"):
+        setattr(sdk, name, type(name, (), {}))
+    sys.modules["scservo_sdk"] = sdk
@@ -0,0 +1,161 @@
+# tests/test_bus.py
+
+import pytest
+
+import bus
+from bus import FeetechBus, COMM_SUCCESS
+
+IDS = [1, 2, 3]
+
+class FakeServos:
+    """Register memory per id, plus a log of every packet sent."""
+    def __init__(self):
+        self.mem = {sid: bytearray(90) for sid in IDS}
+        self.log = []
+
+    def set(self, reg_name, sid, value):
+        addr, length = bus._CTL[reg_name]
+        self.mem[sid][addr:addr + length] = bytes(bus._to_le_bytes(bus._encode(reg_name, value), length))
+
+    def writes(self):
+        return [entry[1:] for entry in self.log if entry[0] == "W"]
+
+@pytest.fixture
+def servos(monkeypatch):
+    fake = FakeServos()
+
+    class PortHandler:
+        def __init__(self, port): pass
+        def openPort(self): return True
+        def setBaudRate(self, baudrate): pass
+        def closePort(self): pass
+
+    class PacketHandler:
+        def __init__(self, protocol): pass
+        def read1ByteTxRx(self, port, sid, addr): return fake.mem[sid][addr], COMM_SUCCESS, 0
+
+    class GroupSyncRead:
+        def __init__(self, port, ph, addr, length): self.addr, self.length = addr, length
+        def addParam(self, sid): pass
+        def txRxPacket(self):
+            fake.log.append(("R", self.addr, self.length))
+            return COMM_SUCCESS
+        def getData(self, sid, addr, length):
+            return int.from_bytes(fake.mem[sid][addr:addr + length], "little")
+
+    class GroupSyncWrite:
+        def __init__(self, port, ph, addr, length): self.addr, self.length, self.params = addr, length, {}
+        def addParam(self, sid, data): self.params[sid] = bytes(data)
+        def txPacket(self):
+            fake.log.append(("W", self.addr, self.length, sorted(self.params)))
+            for sid, data in self.params.items():
+                fake.mem[sid][self.addr:self.addr + self.length] = data
+            return COMM_SUCCESS
+
+    for cls in (PortHandler, PacketHandler, GroupSyncRead, GroupSyncWrite):
+        monkeypatch.setattr(bus, cls.__name__, cls)
+    monkeypatch.setattr(bus.time, "sleep", lambda s: fake.log.append(("S", s)))
+    return fake
+
+LOCK = bus._CTL["Lock"][0]
+
+def test_eeprom_merges_only_for_same_ids(servos):
+    b = FeetechBus("fake", IDS)
+    b.sync_config({"Min_Position_Limit": [10, 20, 30], "Max_Position_Limit": 4000})
+    b.sync_config({"Min_Position_Limit": [11, 20, 30], "Max_Position_Limit": [4000, 4001, 4000]})
+
+    assert servos.writes() == [
+        (9, 4, [1, 2, 3]),      # Min+Max in one packet
+        (9, 2, [1]),            # different ids, not merged
+        (11, 2, [2]),
+    ]
+    assert b.sync_config({"Min_Position_Limit": [11, 20, 30]}) == {}
+
+def test_ram_padding_only_after_fresh_read(servos):
+    b = FeetechBus("fake", IDS)
+    b.sync_config({"Torque_Enable": 1, "Acceleration": [0, 9, 0]})
+    assert servos.writes() == [(40, 2, [1, 2, 3])]     # 1 and 3 padded from the read
+    assert bytes(servos.mem[2][40:42]) == bytes([1, 9])
+
+    # servos 1, 2 tripped, servo 1's Acceleration changed behind our back
+    servos.set("Torque_Enable", 1, 0)
+    servos.set("Torque_Enable", 2, 0)
+    servos.set("Acceleration", 1, 7)
+    servos.log.clear()
+    b.sync_config({"Torque_Enable": 1, "Acceleration": [0, 5, 0]}, refresh=False)
+
+    # the stale cache isn't used to pad servo 1 into the Acceleration write
+    assert servos.writes() == [(40, 1, [1, 2]), (41, 1, [2])]
+    assert bytes(servos.mem[1][40:42]) == bytes([1, 7])
+
+def test_torque_enable_always_read_fresh(servos):
+    b = FeetechBus("fake", IDS)
+    b.set_torque(True)
+    assert b.cached("Torque_Enable") is None
+
+    # protection tripped on servo 1
+    servos.set("Torque_Enable", 1, 0)
+    servos.log.clear()
+    changes = b.sync_config({"Torque_Enable": 1}, refresh=False)
+
+    assert changes == {"Torque_Enable": {1: 1}}
+    assert servos.writes() == [(40, 1, [1])]
+    assert servos.mem[1][40] == 1
+
+def test_lock_sequence_around_eeprom(servos):
+    servos.set("Lock", 2, 1)
+    b = FeetechBus("fake", IDS)
+    changes = b.sync_config({"Homing_Offset": [-5, -6, 0]})
+
+    assert changes == {"Homing_Offset": {1: -5, 2: -6}}
+    assert [entry[0] for entry in servos.log] == ["R", "W", "W", "S", "W"]
+    assert servos.writes() == [(LOCK, 1, [2]), (31, 2, [1, 2]), (LOCK, 1, [2])]
+    assert servos.mem[2][LOCK] == 1
+    assert b.sync_read("Homing_Offset").tolist() == [-5, -6, 0]
+
+def test_requested_lock_written_last(servos):
+    for sid in IDS:
+        servos.set("Lock", sid, 1)
+    b = FeetechBus("fake", IDS)
+    changes = b.sync_config({"Homing_Offset": 7, "Lock": 0}, ids=[1])
+
+    assert servos.writes() == [(LOCK, 1, [1]), (31, 2, [1])]
+    assert changes == {"Homing_Offset": {1: 7}, "Lock": {1: 0}}
+    assert servos.mem[1][LOCK] == 0
+
+    servos.log.clear()
+    b.sync_config({"Homing_Offset": 8, "Lock": 1}, ids=[1])
+    assert servos.writes() == [(31, 2, [1]), (LOCK, 1, [1])]
+    assert servos.mem[1][LOCK] == 1
+
+def test_set_torque_tolerates_tx_fail(servos, monkeypatch):
+    b = FeetechBus("fake", IDS)
+    b.sync_write("Acceleration", [1, 1, 1])
+    assert b.cached("Acceleration").tolist() == [1, 1, 1]
+
+    monkeypatch.setattr(bus.GroupSyncWrite, "txPacket", lambda self: bus.COMM_TX_FAIL)
+    b.set_torque(False)
+    b.sync_write("Acceleration", [2, 2, 2], tolerate_tx_fail=True)
+    assert b.cached("Acceleration") is None
+    with pytest.raises(RuntimeError):
+        b.sync_write("Acceleration", [0, 0, 0])
+
+@pytest.mark.parametrize("reg_name", ["ID", "Baud_Rate"])
+def test_bus_settings_rejected(servos, reg_name):
+    b = FeetechBus("fake", IDS)
+    with pytest.raises(ValueError):
+        b.sync_config({reg_name: 7})
+    assert servos.writes() == []
+
+def test_write_error_survives_failed_relock(servos, monkeypatch):
+    servos.set("Lock", 1, 1)
+    b = FeetechBus("fake", IDS)
+
+    def tx_fail(self):
+        if self.addr != LOCK or self.params == {1: b"\x01"}:
+            return bus.COMM_TX_FAIL
+        return COMM_SUCCESS
+    monkeypatch.setattr(bus.GroupSyncWrite, "txPacket", tx_fail)
+
+    with pytest.raises(RuntimeError, match="Homing_Offset"):
+        b.sync_config({"Homing_Offset": 5}, ids=[1])
@@ -0,0 +1,104 @@
+# tests/test_fanout.py
+
+import time
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+from fanout import handle_subscription, forward
+from utils import make_sub, recv_latest, decimated_topic
+
+TOPIC = "so101_leader.state_real"
+
+class FakeXPub:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg, flags=0):
+        self.sent.append([msg])
+
+    def send_multipart(self, frames, flags=0):
+        self.sent.append(frames)
+
+def sub_frame(topic, subscribe=True):
+    return [bytes([1 if subscribe else 0]) + topic.encode()]
+
+def test_subscribe_unsubscribe_tracking():
+    rates = {}
+    topic = decimated_topic(TOPIC, 10)
+    handle_subscription(sub_frame(topic), TOPIC, rates)
+    assert rates == {topic: [0.1, 0.0]}
+
+    # full-rate and other arms' topics aren't decimated streams
+    handle_subscription(sub_frame(TOPIC), TOPIC, rates)
+    handle_subscription(sub_frame("@10hz/so101_follower.state_real"), TOPIC, rates)
+    assert list(rates) == [topic]
+
+    handle_subscription(sub_frame(topic, subscribe=False), TOPIC, rates)
+    assert rates == {}
+
+@pytest.mark.parametrize("frames", [
+    [b""],
+    [b"\x02" + decimated_topic(TOPIC, 10).encode()],
+    sub_frame(decimated_topic(TOPIC, 10)) + [b"extra"],
+    [],
+])
+def test_malformed_frames_ignored(frames):
+    rates = {}
+    handle_subscription(frames, TOPIC, rates)
+    assert rates == {}
+
+@pytest.mark.parametrize("rate", ["0", "0.0", "1.2.3", "."])
+def test_bad_rates_rejected(rate):
+    rates = {}
+    handle_subscription(sub_frame(f"@{rate}hz/{TOPIC}"), TOPIC, rates)
+    assert rates == {}
+
+@pytest.mark.parametrize("rate_hz", [10, 30, 40])
+def test_decimated_rate_matches_request(rate_hz):
+    xpub, rates = FakeXPub(), {}
+    topic = decimated_topic(TOPIC, rate_hz)
+    handle_subscription(sub_frame(topic), TOPIC, rates)
+
+    for i in range(1000):   # 10 s of a 100 Hz loop
+        forward(xpub, rates, TOPIC, b"{}", 100.0 + i * 0.01)
+
+    n = sum(1 for frames in xpub.sent if frames[0] == topic.encode())
+    assert sum(1 for frames in xpub.sent if frames[0] == TOPIC.encode()) == 1000
+    assert abs(n - 10 * rate_hz) <= 1
+
+def test_decimation_restarts_after_gap():
+    xpub, rates = FakeXPub(), {}
+    topic = decimated_topic(TOPIC, 10)
+    handle_subscription(sub_frame(topic), TOPIC, rates)
+
+    forward(xpub, rates, TOPIC, b"{}", 100.0)
+    forward(xpub, rates, TOPIC, b"{}", 105.0)   # upstream paused for 5 s
+    forward(xpub, rates, TOPIC, b"{}", 105.01)
+
+    assert [frames[0] for frames in xpub.sent].count(topic.encode()) == 2
+
+def test_single_frame_forward():
+    xpub, rates = FakeXPub(), {}
+    forward(xpub, rates, TOPIC, b'{"t": 1}', 0.0, single_frame=True)
+    assert xpub.sent == [[TOPIC.encode() + b' {"t": 1}']]
+
+def test_conflated_client_gets_newest():
+    ctx = zmq.Context()
+    xpub = ctx.socket(zmq.XPUB)
+    xpub.bind("inproc://fanout-latest")
+    sub = make_sub(ctx, "inproc://fanout-latest", TOPIC, conflate=True)
+    try:
+        assert xpub.poll(1000)
+        handle_subscription(xpub.recv_multipart(), TOPIC, {})
+
+        for i in range(100):
+            forward(xpub, {}, TOPIC, f'{{"i": {i}}}'.encode(), 0.0, single_frame=True)
+        time.sleep(0.05)
+
+        assert recv_latest(sub) == b'{"i": 99}'
+        assert recv_latest(sub) is None
+    finally:
+        sub.close(0)
+        xpub.close(0)
+        ctx.term()
@@ -2,8 +2,10 @@
 import zmq
 import numpy as np
 
-def make_pub(ctx, addr, topic_name, bind=True):
+def make_pub(ctx, addr, topic_name, bind=True, sndhwm=None):
     pub = ctx.socket(zmq.PUB)
+    if sndhwm is not None:
+        pub.setsockopt(zmq.SNDHWM, sndhwm)
     if bind:
         pub.bind(addr)
         print(f"Publishing (bind) on {addr}, topic = {topic_name}")
@@ -12,14 +14,36 @@ def make_pub(ctx, addr, topic_name, bind=True):
         print(f"Publishing (connect) to {addr}, topic = {topic_name}")
     return pub
 
-def make_sub(ctx, addr, topic_name):
+def make_sub(ctx, addr, topic_name, conflate=False):
     sub = ctx.socket(zmq.SUB)
+    if conflate:
+        # keeps only the newest message, but only works for single-frame
+        # messages, i.e. fanout.py's latest-only port
+        sub.setsockopt(zmq.CONFLATE, 1)
     sub.setsockopt(zmq.SUBSCRIBE, topic_name.encode())
-    # sub.setsockopt(zmq.CONFLATE, 1)
     sub.connect(addr)
     print(f"Subscribed to {addr}, topic = {topic_name}")
     return sub
 
+def recv_latest(sub):
+    """Drain all queued messages, return the latest payload (or None).
+
+    Handles both [topic, payload] and single-frame b"topic payload" messages.
+    """
+    latest_payload = None
+    while sub.poll(timeout=0):
+        frames = sub.recv_multipart(flags=zmq.NOBLOCK)
+        latest_payload = frames[-1] if len(frames) > 1 else frames[0].split(b" ", 1)[-1]
+    return latest_payload
+
+def decimated_topic(topic_name, rate_hz):
+    """Topic fanout.py publishes `topic_name` on at `rate_hz`.
+
+    The rate goes in front so subscribers of the full-rate topic
+    don't prefix-match the decimated copies.
+    """
+    return f"@{rate_hz:g}hz/{topic_name}"
+
 NORM_RANGE_MAX = 200.0
 
 def to_norm(raw_vals, calib_by_id, ids):